@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import logging
+import math
+import sys
 from abc import ABC
 from abc import abstractmethod
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import IO
 
 from ib_insync import Ticker
 from kafka import KafkaProducer
@@ -14,42 +19,50 @@ logger = logging.getLogger(__name__)
 
 
 class Handler(ABC):
+    """Market data callback, called with the tickers updated in one burst,
+    at most one per symbol."""
+
     @abstractmethod
-    def __call__(self, tickers: set[Ticker]):
+    def __call__(self, tickers: Sequence[Ticker]):
         raise NotImplementedError
 
 
 class RawTickerKafkaHandler(Handler):
-    """write tickers to kafka topic"""
+    """write tickers to kafka topic
 
-    def __init__(self, topic: str):
-        self.topic = topic
+    Tickers without a last price, and by default tickers outside the core
+    market session, are dropped here instead of by the consumers.
+    """
 
-    def _create_producer(self):
-        self._producer = KafkaProducer(
-            bootstrap_servers="localhost:9092",
-            key_serializer=utils.str2bytes,
-            value_serializer=utils.object2bytes,
-            acks=1,
-            retries=3,
-            max_in_flight_requests_per_connection=1,
-        )
+    def __init__(
+        self,
+        topic: str,
+        producer: KafkaProducer | None = None,
+        core_market_only: bool = True,
+    ):
+        self.topic = topic
+        self._producer = producer or utils.get_shared_producer()
+        self.core_market_only = core_market_only
 
     def to_kafka(self, ticker: Ticker):
-        assert ticker.contract is not None
-        logger.info("sending ticker to kafka: %s", ticker.contract.symbol)
-        if not hasattr(self, "_producer"):
-            self._create_producer()
-        assert ticker.contract is not None
+        # contracts are validated when market data is requested
         raw_ticker = RawTicker.from_ticker(ticker)
+        if math.isnan(raw_ticker.last):
+            return
+        if self.core_market_only and not utils.is_core_market_minutes(
+            raw_ticker.time,
+        ):
+            return
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("sending ticker to kafka: %s", raw_ticker.symbol)
         self._producer.send(
             self.topic,
-            key=ticker.contract.symbol,
+            key=utils.str2bytes(raw_ticker.symbol),
             value=raw_ticker.to_message(),
             timestamp_ms=raw_ticker.time.timestamp_ms(),
         )
 
-    def __call__(self, tickers: set[Ticker]):
+    def __call__(self, tickers: Sequence[Ticker]):
         for ticker in tickers:
             self.to_kafka(ticker)
 
@@ -66,20 +79,56 @@ class RawTickerFileHandler(Handler):
         self.directory = directory
         utils.makedirs(self.directory)
         self.filename_prefix = filename_prefix
+        self.mode = mode
+        # symbol -> open file for the current day, kept open across calls
+        self._fhs: dict[str, IO[str]] = {}
+        self._prefix = ""
+        self._next_rollover_ms = 0
+
+    def _roll_over(self):
+        """Close the previous day's files and compute the new prefix"""
+        self.close()
+        if self.filename_prefix:
+            self._prefix = self.filename_prefix
+            self._next_rollover_ms = sys.maxsize
+            return
+        today = utils.datetime2datestr(
+            utils.get_local_now(),
+            format="%Y%m%d",
+        )
+        self._prefix = f"raw_ticker_{today}"
+        _, self._next_rollover_ms = utils.get_local_day_bounds_ms()
 
     def _get_filename(self, symbol: str) -> str:
-        prefix = self.filename_prefix
-        if not prefix:
-            today = utils.datetime2datestr(
-                utils.get_local_now(),
-                format="%Y%m%d",
+        return f"{self.directory}/{self._prefix}_{symbol}.txt"
+
+    def _get_file(self, symbol: str) -> IO[str]:
+        fh = self._fhs.get(symbol)
+        if fh is None:
+            fh = open(
+                self._get_filename(symbol),
+                self.mode,
+                buffering=1 << 16,
             )
-            prefix = f"raw_ticker_{today}"
-        return f"{self.directory}/{prefix}_{symbol}.txt"
+            self._fhs[symbol] = fh
+        return fh
 
-    def __call__(self, tickers: set[Ticker]):
+    def close(self):
+        for fh in self._fhs.values():
+            fh.close()
+        self._fhs.clear()
+
+    def __call__(self, tickers: Sequence[Ticker]):
+        groups: defaultdict[str, list[Ticker]] = defaultdict(list)
         for ticker in tickers:
-            assert ticker.contract is not None
-            filename = self._get_filename(ticker.contract.symbol)
-            with open(filename, "a") as f:
-                f.write(f"{ticker}\n")
+            groups[ticker.contract.symbol].append(  # type: ignore[union-attr]
+                ticker,
+            )
+        if utils.get_now_ms() >= self._next_rollover_ms:
+            self._roll_over()
+        for symbol, group in groups.items():
+            fh = self._get_file(symbol)
+            fh.writelines(f"{t}\n" for t in group)
+            # still one write per symbol per burst, but nothing is left in
+            # the buffer if the process is killed
+            fh.flush()
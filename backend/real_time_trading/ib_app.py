@@ -6,6 +6,7 @@ from typing import Callable
 import nest_asyncio
 from eventkit import Event
 from ib_insync import IB
+from ib_insync import Ticker
 from ib_insync import util
 from ib_insync.contract import Stock
 from real_time_trading import constants
@@ -15,26 +16,31 @@ from real_time_trading.handlers import RawTickerKafkaHandler
 
 
 nest_asyncio.apply()
-util.logToConsole(logging.INFO)
-logging.getLogger("kafka").setLevel(logging.INFO)
 
+logger = logging.getLogger()
 
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+def setup_logging():
+    """Attach the console and log file handlers, called from __main__ so
+    that importing this module has no side effects."""
+    util.logToConsole(logging.INFO)
+    logging.getLogger("kafka").setLevel(logging.INFO)
+
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
 
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(formatter)
-logger.addHandler(ch)
+    logger.setLevel(logging.DEBUG)
 
-fh = logging.FileHandler(constants.IBAPP_LOG_FILE)
-fh.setLevel(logging.DEBUG)
-fh.setFormatter(formatter)
-logger.addHandler(fh)
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+    fh = logging.FileHandler(constants.IBAPP_LOG_FILE)
+    fh.setLevel(logging.DEBUG)
+    fh.setFormatter(formatter)
+    logger.addHandler(fh)
 
 
 class AsyncIBApp:
@@ -45,7 +51,8 @@ class AsyncIBApp:
         self.port = port
         self.client_id = client_id
         self._ib = IB()
-        # self.market_data_callbacks: List[Handler] = []
+        self.market_data_callbacks: list[Handler] = []
+        self._ib.pendingTickersEvent += self._on_pending_tickers
 
     def connect(self):
         self._ib.connect(
@@ -62,6 +69,10 @@ class AsyncIBApp:
         contracts: list[Stock],
         callbacks: list[Handler],
     ):
+        # handlers rely on every ticker having a contract with a symbol
+        for contract in contracts:
+            if not contract.symbol:
+                raise ValueError(f"contract has no symbol: {contract}")
         for contract in contracts:
             self._ib.reqMktData(
                 contract=contract,
@@ -71,9 +82,26 @@ class AsyncIBApp:
                 mktDataOptions=[],
             )
 
+        # called again on every reconnect, only register new callbacks
         for callback in callbacks:
-            self._ib.pendingTickersEvent += callback
-            # self.market_data_callbacks.append(callback)
+            if callback not in self.market_data_callbacks:
+                self.market_data_callbacks.append(callback)
+
+    def _on_pending_tickers(self, tickers: set[Ticker]):
+        # build the list once for all handlers, one ticker per symbol
+        unique = list(
+            {
+                t.contract.symbol: t  # type: ignore[union-attr]
+                for t in tickers
+            }.values(),
+        )
+        # a failing handler, e.g. kafka while the broker is down, must not
+        # keep the others from seeing the tickers
+        for callback in self.market_data_callbacks:
+            try:
+                callback(unique)
+            except Exception:
+                logger.exception("market data callback %s failed", callback)
 
     def run(self):
         self._ib.run()
@@ -90,6 +118,7 @@ class AsyncIBApp:
 
 
 if __name__ == "__main__":
+    setup_logging()
     CONTRACTS = [Stock(**stk) for stk in constants.CONTRACTS]
     raw_ticker_kafka_handler = RawTickerKafkaHandler(
         topic=constants.RAW_TICKER_EVENT,
@@ -127,4 +156,7 @@ if __name__ == "__main__":
     ibapp.register_event_handler("disconnectedEvent", on_disconnected)
 
     ibapp.connect()
-    ibapp.run()
+    try:
+        ibapp.run()
+    finally:
+        raw_ticker_file_handler.close()
@@ -4,10 +4,11 @@ import logging
 from dataclasses import dataclass
 from typing import Any
 
-import constants
 import nest_asyncio
+from aiokafka import AIOKafkaProducer
 from ib_insync.contract import Stock
-from kafka import KafkaProducer
+from real_time_trading import constants
+from real_time_trading import utils
 from real_time_trading.objects.raw_ticker import RawTicker
 from real_time_trading.objects.utc_datetime import UTCDateTime
 
@@ -49,12 +50,26 @@ class IntradayEvent:
 
 
 class IntradayTicker:
+    __slots__ = (
+        "contract",
+        "kafka_producer",
+        "intraday_high_threshold",
+        "intraday_low_threshold",
+        "first_price",
+        "last_price",
+        "gap",
+        "intraday_high",
+        "intraday_low",
+        "intraday_highs",
+        "intraday_lows",
+    )
+
     NO_VALUE: float = -1.0  # TODO: revisit, change to np.nan?
 
     def __init__(
         self,
         contract: Stock,
-        kafka_producer: KafkaProducer,
+        kafka_producer: AIOKafkaProducer,
         intraday_high_threshold: float = 0.0,
         intraday_low_threshold: float = 0.0,
     ):
@@ -78,13 +93,15 @@ class IntradayTicker:
     #     assert self.tickers[-1].time is not None
     #     return self.tickers[-1].time
 
-    def reset(self):
+    def reset(self) -> None:
         # self.tickers: list[RawTicker] = []
         self.first_price: float = self.NO_VALUE
         self.last_price: float = self.NO_VALUE
+        # gap of last_price, refreshed by update so reads are plain loads
+        self.gap: float = 0.0
 
         self.intraday_high: float = self.NO_VALUE
-        self.intrady_low: float = self.NO_VALUE
+        self.intraday_low: float = self.NO_VALUE
 
         self.intraday_highs: list[IntradayEvent] = []
         self.intraday_lows: list[IntradayEvent] = []
@@ -93,16 +110,12 @@ class IntradayTicker:
         # return len(self.tickers) > 0
         return self.first_price != self.NO_VALUE
 
-    def _get_gap(self, price) -> float:
+    def _get_gap(self, price: float) -> float:
         if not self.hasData():
             logger.warning("Ticker %s has no data", self.contract.symbol)
             return 0.0
         return (price - self.first_price) / self.first_price
 
-    @property
-    def gap(self) -> float:
-        return self._get_gap(self.last_price)
-
     def is_new_high(self, ticker: RawTicker) -> bool:
         if not self.hasData():
             return False
@@ -117,7 +130,7 @@ class IntradayTicker:
             1 - self.intraday_low_threshold
         )
 
-    def update(self, raw_ticker: RawTicker) -> bool:
+    async def update(self, raw_ticker: RawTicker) -> bool:
         assert raw_ticker.symbol == self.contract.symbol
         update_flag = False
 
@@ -130,10 +143,10 @@ class IntradayTicker:
                 count=len(self.intraday_highs) + 1,
             )
             self.intraday_highs.append(intraday_high)
-            self.kafka_producer.send(
+            await self.kafka_producer.send(
                 constants.INTRADAY_HIGH_EVENT,
-                key=self.contract.symbol,
-                value=intraday_high.to_event_message(),
+                key=utils.str2bytes(self.contract.symbol),
+                value=utils.object2bytes(intraday_high.to_event_message()),
                 timestamp_ms=raw_ticker.time.timestamp_ms(),
             )
             logger.info("sending intraday high event")
@@ -148,10 +161,10 @@ class IntradayTicker:
                 count=len(self.intraday_lows) + 1,
             )
             self.intraday_lows.append(intraday_low)
-            self.kafka_producer.send(
+            await self.kafka_producer.send(
                 constants.INTRADAY_LOW_EVENT,
-                key=self.contract.symbol,
-                value=intraday_low.to_event_message(),
+                key=utils.str2bytes(self.contract.symbol),
+                value=utils.object2bytes(intraday_low.to_event_message()),
                 timestamp_ms=raw_ticker.time.timestamp_ms(),
             )
             logger.info("sending intraday low event")
@@ -164,5 +177,6 @@ class IntradayTicker:
             self.first_price = raw_ticker.last
             self.intraday_high = raw_ticker.last
             self.intraday_low = raw_ticker.last
+        self.gap = self._get_gap(self.last_price)
 
         return update_flag
@@ -1,45 +1,52 @@
 from __future__ import annotations
 
+import struct
 from dataclasses import dataclass
-from typing import Any
 
 from ib_insync import Ticker
 from real_time_trading.objects.utc_datetime import UTCDateTime
 
 
+# fixed layout: time in microseconds since epoch, last, bid, ask,
+# followed by the utf-8 encoded symbol
+MESSAGE_HEADER = struct.Struct("<qddd")
+
+
 @dataclass
 class RawTicker:
+    __slots__ = ("symbol", "last", "bid", "ask", "time")
+
     symbol: str
     last: float
     bid: float
     ask: float
     time: UTCDateTime
 
-    def to_message(self) -> dict[str, Any]:
-        return {
-            "symbol": self.symbol,
-            "last": self.last,
-            "bid": self.bid,
-            "ask": self.ask,
-            "time": self.time.to_isoforamt(),
-        }
+    def to_message(self) -> bytes:
+        return MESSAGE_HEADER.pack(
+            self.time.timestamp_us(),
+            self.last,
+            self.bid,
+            self.ask,
+        ) + self.symbol.encode("utf-8")
 
     @staticmethod
-    def from_message(message: dict[str, Any]) -> RawTicker:
+    def from_message(message: bytes) -> RawTicker:
+        # parse in place, the symbol is decoded straight from a view
+        time_us, last, bid, ask = MESSAGE_HEADER.unpack_from(message)
         return RawTicker(
-            symbol=message["symbol"],
-            last=message["last"],
-            bid=message["bid"],
-            ask=message["ask"],
-            time=UTCDateTime.from_isoformat(message["time"]),
+            symbol=str(memoryview(message)[MESSAGE_HEADER.size:], "utf-8"),
+            last=last,
+            bid=bid,
+            ask=ask,
+            time=UTCDateTime.from_timestamp_us(time_us),
         )
 
     @staticmethod
     def from_ticker(ticker: Ticker) -> RawTicker:
-        assert ticker.contract is not None
         assert ticker.time is not None
         return RawTicker(
-            symbol=ticker.contract.symbol,
+            symbol=ticker.contract.symbol,  # type: ignore[union-attr]
             last=ticker.last,
             bid=ticker.bid,
             ask=ticker.ask,
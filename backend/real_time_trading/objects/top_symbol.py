@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Any
 
 from real_time_trading.objects.intraday_ticker import IntradayTicker
@@ -51,6 +52,11 @@ class TopNSymbols:
         self.time = time
         self.symbols = top_symbols
 
+    @cached_property
+    def signature(self) -> tuple[str, ...]:
+        """Symbols in rank order, what decides whether an event is new"""
+        return tuple(s.symbol for s in self.symbols)
+
     def to_message(self) -> dict[str, Any]:
         return {
             "time": self.time.to_isoforamt(),
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
 from datetime import tzinfo
 
@@ -104,6 +105,12 @@ class UTCDateTime(datetime):
         dt = datetime.utcfromtimestamp(timestamp)
         return cls.from_timezone_naive(dt)
 
+    @classmethod
+    def from_timestamp_us(cls, timestamp_us: int) -> UTCDateTime:
+        """Exact inverse of timestamp_us, no float rounding involved."""
+        dt = _NAIVE_EPOCH + timedelta(microseconds=timestamp_us)
+        return cls.from_timezone_naive(dt)
+
     @classmethod
     def from_utc(cls, dt: datetime) -> UTCDateTime:
         """Convert datetime that is already in UTC to UTCDateTime.
@@ -144,5 +151,12 @@ class UTCDateTime(datetime):
     def timestamp_ms(self) -> int:
         return int(self.timestamp() * 1000)
 
+    def timestamp_us(self) -> int:
+        return (self - _UTC_EPOCH) // timedelta(microseconds=1)
+
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = UTCDateTime(1970, 1, 1)
+
 
 LOCAL_TIMEZONE = datetime.now().astimezone().tzinfo
@@ -1,38 +1,51 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import math
-from datetime import timedelta
 
+from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaProducer
+from aiokafka import ConsumerRecord
 from ib_insync.contract import Stock
-from kafka import KafkaConsumer
-from kafka import KafkaProducer
 from real_time_trading import constants
 from real_time_trading import utils
 from real_time_trading.objects.intraday_ticker import IntradayTicker
 from real_time_trading.objects.raw_ticker import RawTicker
 from real_time_trading.objects.top_symbol import TopNSymbols
 from real_time_trading.objects.utc_datetime import UTCDateTime
+from sortedcontainers import SortedKeyList
 
 
-logging.getLogger("kafka").setLevel(logging.WARN)
+logger = logging.getLogger()
 
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
+def setup_logging():
+    """Attach the console and log file handlers, called by main so that
+    importing this module has no side effects."""
+    logging.getLogger("kafka").setLevel(logging.WARN)
+    logging.getLogger("aiokafka").setLevel(logging.WARN)
+
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
 
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(formatter)
-logger.addHandler(ch)
+    logger.setLevel(logging.DEBUG)
 
-fh = logging.FileHandler(constants.RTT_LOG_FILE)
-fh.setLevel(logging.DEBUG)
-fh.setFormatter(formatter)
-logger.addHandler(fh)
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+    fh = logging.FileHandler(constants.RTT_LOG_FILE)
+    fh.setLevel(logging.DEBUG)
+    fh.setFormatter(formatter)
+    logger.addHandler(fh)
+
+
+# module level aliases for the per-message hot path
+_from_message = RawTicker.from_message
+_get_now_ms = utils.get_now_ms
 
 
 class Trader:
@@ -46,46 +59,56 @@ class Trader:
         n_bottom_tickers: int = 4,
         intraday_high_threshold: float = 0.0,
         intraday_low_threshold: float = 0.0,
+        producer: AIOKafkaProducer | None = None,
         _bypass_update_window: bool = False,
     ):
-        # set up kafka consumer and producer
-        self._consumer = KafkaConsumer(
+        # set up kafka consumer and producer, must be created inside a
+        # running event loop; they are started in consume
+        self._consumer = AIOKafkaConsumer(
             constants.RAW_TICKER_EVENT,
             bootstrap_servers=constants.KAFKA_BOOTSTRAP_SERVERS,
             key_deserializer=utils.bytes2str,
-            value_deserializer=utils.bytes2object,
+            # raw tickers are decoded by RawTicker.from_message
             auto_offset_reset="earliest",
+            # ticks are tiny, let the broker fill larger responses instead
+            # of answering as soon as a single message is available
+            fetch_min_bytes=16384,
+            fetch_max_wait_ms=20,
+            max_partition_fetch_bytes=1048576,
+            max_poll_records=500,
         )
-        # set up consumer to start from start_time
-        utils.set_offsets_by_time(self._consumer, start_time)
-
-        # shared producer for all tickers
-        self._intraday_producer = KafkaProducer(
-            bootstrap_servers=constants.KAFKA_BOOTSTRAP_SERVERS,
-            key_serializer=utils.str2bytes,
-            value_serializer=utils.object2bytes,
-            acks=1,
-            retries=3,
-            max_in_flight_requests_per_connection=1,
-        )
+        self.start_time = start_time
 
-        self._top_symbol_producer = KafkaProducer(
+        # shared producer for intraday and top symbol events, keys and
+        # values are serialized by the callers. Both event streams are rare
+        # and latency sensitive, so keep linger low
+        self._own_producer = producer is None
+        self._producer = producer or AIOKafkaProducer(
             bootstrap_servers=constants.KAFKA_BOOTSTRAP_SERVERS,
-            # key_serializer=utils.str2bytes,
-            value_serializer=utils.object2bytes,
             acks=1,
-            retries=3,
-            max_in_flight_requests_per_connection=1,
+            linger_ms=1,
+            max_batch_size=131072,
+            compression_type="lz4",
         )
 
         self.tickers: dict[str, IntradayTicker] = {}
         for contract in contracts:
             self.tickers[contract.symbol] = IntradayTicker(
                 contract=contract,
-                kafka_producer=self._intraday_producer,
+                kafka_producer=self._producer,
                 intraday_high_threshold=intraday_high_threshold,
                 intraday_low_threshold=intraday_low_threshold,
             )
+        self._tickers_get = self.tickers.get
+        # symbols sorted by gap, _last_gap holds the gap each symbol was
+        # indexed with so it can be found again when its gap changes
+        self._last_gap: dict[str, float] = {
+            symbol: 0.0 for symbol in self.tickers
+        }
+        self._gap_index = SortedKeyList(
+            self.tickers,
+            key=self._last_gap.__getitem__,
+        )
 
         self.bake_in_minutes = bake_in_minutes
         self.bake_out_minutes = bake_out_minutes
@@ -94,116 +117,144 @@ class Trader:
         self.top_n_symbols: TopNSymbols | None = None
         self.bottom_n_symbols: TopNSymbols | None = None
         self._bypass_update_window = _bypass_update_window
+        # utc day -> (open after bake in, close before bake out) in ms
+        self._update_windows: dict[int, tuple[int, int] | None] = {}
+        self._refresh_today()
+
+    def _refresh_today(self) -> None:
+        """Cache the local day boundaries used to drop stale tickers"""
+        (
+            self._today_start_ms,
+            self._tomorrow_start_ms,
+        ) = utils.get_local_day_bounds_ms()
 
-    def inside_update_window(self, dt: UTCDateTime) -> bool:
-        open_, close = utils.get_market_open_close(dt)
-        if open_ is None or close is None:
+    def _get_update_window(self, time_ms: int) -> tuple[int, int] | None:
+        day = time_ms // utils.MS_PER_DAY
+        if day not in self._update_windows:
+            open_ms, close_ms = utils.get_market_open_close_ms(time_ms)
+            if open_ms is None or close_ms is None:
+                self._update_windows[day] = None
+            else:
+                self._update_windows[day] = (
+                    open_ms + self.bake_in_minutes * 60_000,
+                    close_ms - self.bake_out_minutes * 60_000,
+                )
+        return self._update_windows[day]
+
+    def inside_update_window(self, time_ms: int) -> bool:
+        window = self._get_update_window(time_ms)
+        if window is None:
             return False
-        open_after_bake_in = open_ + timedelta(minutes=self.bake_in_minutes)
-        close_before_bake_out = close - timedelta(
-            minutes=self.bake_out_minutes,
-        )
-        return dt >= open_after_bake_in and dt < close_before_bake_out
+        return window[0] <= time_ms < window[1]
 
-    def rank_tickers(self):
-        tickers = list(self.tickers.values())
-        tickers.sort(key=lambda t: t.gap)
-        return tickers
+    def _update_gap_index(self, ticker: IntradayTicker) -> None:
+        symbol = ticker.contract.symbol
+        gap = ticker.gap
+        # a nan key can never be found again, keep the last good gap
+        if not math.isfinite(gap) or gap == self._last_gap[symbol]:
+            return
+        self._gap_index.remove(symbol)
+        self._last_gap[symbol] = gap
+        self._gap_index.add(symbol)
 
-    def get_top_n_tickers(
-        self,
-        time: UTCDateTime,
-        tickers: list[IntradayTicker],
-        n: int,
-    ) -> TopNSymbols:
-        """Return top n tickers by gap with a positive gap"""
-        return TopNSymbols.from_tickers(
-            time,
-            [t for t in tickers if t.gap > 0][:n],
-        )
+    def _top_n_symbols(self, n: int) -> list[str]:
+        start = self._gap_index.bisect_key_right(0.0)
+        return list(self._gap_index.islice(start, start + n))
 
-    def get_bottom_n_tickers(
-        self,
-        time: UTCDateTime,
-        tickers: list[IntradayTicker],
-        n: int,
-    ) -> TopNSymbols:
-        """Return bottom n tickers by gap with a negative gap"""
-        return TopNSymbols.from_tickers(
-            time,
-            [t for t in tickers if t.gap < 0][:n],
-        )
+    def _bottom_n_symbols(self, n: int) -> list[str]:
+        stop = min(n, self._gap_index.bisect_key_left(0.0))
+        return list(self._gap_index.islice(0, stop))
 
-    def _check_top_symbols(self, time: UTCDateTime):
-        tickers = self.rank_tickers()
-        top_n_symbols = self.get_top_n_tickers(
-            time,
-            tickers,
-            self.n_top_tickers,
-        )
-        if self.top_n_symbols is None or top_n_symbols != self.top_n_symbols:
-            self.top_n_symbols = top_n_symbols
-            self._top_symbol_producer.send(
+    async def _check_top_symbols(self, time: UTCDateTime) -> None:
+        # compare symbols in rank order before materializing, prices alone
+        # moving does not make a new event
+        top = tuple(self._top_n_symbols(self.n_top_tickers))
+        if self.top_n_symbols is None or top != self.top_n_symbols.signature:
+            self.top_n_symbols = TopNSymbols.from_tickers(
+                time,
+                [self.tickers[s] for s in top],
+            )
+            await self._producer.send(
                 constants.TOP_HIGH_EVENT,
-                value=self.top_n_symbols.to_message(),
+                value=utils.object2bytes(self.top_n_symbols.to_message()),
                 timestamp_ms=time.timestamp_ms(),
             )
             logger.info("sending top high event")
-        bottom_n_symbols = self.get_bottom_n_tickers(
-            time,
-            tickers,
-            self.n_bottom_tickers,
-        )
+        bottom = tuple(self._bottom_n_symbols(self.n_bottom_tickers))
         if (
             self.bottom_n_symbols is None
-            or bottom_n_symbols != self.bottom_n_symbols
+            or bottom != self.bottom_n_symbols.signature
         ):
-            self.bottom_n_symbols = bottom_n_symbols
-            self._top_symbol_producer.send(
+            self.bottom_n_symbols = TopNSymbols.from_tickers(
+                time,
+                [self.tickers[s] for s in bottom],
+            )
+            await self._producer.send(
                 constants.TOP_LOW_EVENT,
-                value=self.bottom_n_symbols.to_message(),
+                value=utils.object2bytes(
+                    self.bottom_n_symbols.to_message(),
+                ),
                 timestamp_ms=time.timestamp_ms(),
             )
             logger.info("sending top low event")
 
-    def _consume(self, message):
-        # TODO: more efficient way to filter out old tickers
-        today = utils.datetime2datestr(utils.get_local_now())
-        logger.debug("today: %s", today)
-        raw_ticker = RawTicker.from_message(message.value)
-        logger.debug("raw_ticker time: %s", raw_ticker.time.to_timezone())
-        if utils.datetime2datestr(raw_ticker.time.to_timezone()) < today:
-            logger.warning("ticker is from previous day: %s", raw_ticker.time)
+    async def _consume(self, message: ConsumerRecord) -> None:
+        if _get_now_ms() >= self._tomorrow_start_ms:
+            self._refresh_today()
+        raw_ticker = _from_message(message.value)
+        time = raw_ticker.time
+        time_ms = time.timestamp_ms()
+        if time_ms < self._today_start_ms:
+            logger.warning("ticker is from previous day: %s", time)
             return
         if not self._bypass_update_window and not self.inside_update_window(
-            raw_ticker.time,
+            time_ms,
         ):
             logger.warning(
                 "ticker is outside update window: %s",
-                raw_ticker.time.to_timezone(),
+                time.to_timezone(),
             )
             return
         if math.isnan(raw_ticker.last):
             logger.warning("ticker has nan last price: %s", raw_ticker)
             return
-        intraday_ticker = self.tickers.get(raw_ticker.symbol)
+        intraday_ticker = self._tickers_get(raw_ticker.symbol)
         if intraday_ticker is None:
             logger.warning(
                 "ticker not found for symbol: %s",
                 raw_ticker.symbol,
             )
             return
-        updated = intraday_ticker.update(raw_ticker)
+        updated = await intraday_ticker.update(raw_ticker)
+        self._update_gap_index(intraday_ticker)
         if updated:
-            self._check_top_symbols(raw_ticker.time)
+            await self._check_top_symbols(time)
 
-    def consume(self):
-        for msg in self._consumer:
-            logger.debug("consuming message: %s", msg)
-            self._consume(msg)
+    async def consume(self) -> None:
+        await self._consumer.start()  # type: ignore
+        if self._own_producer:
+            await self._producer.start()
+        # set up consumer to start from start_time
+        await utils.set_offsets_by_time_aiokafka(
+            self._consumer,
+            self.start_time,
+        )
+        # bind once, these are looked up for every message otherwise
+        debug = logger.isEnabledFor(logging.DEBUG)
+        _consume = self._consume
+        try:
+            async for msg in self._consumer:
+                if debug:
+                    logger.debug("consuming message: %s", msg)
+                await _consume(msg)
+        finally:
+            await self._consumer.stop()  # type: ignore
+            if self._own_producer:
+                await self._producer.stop()
 
 
-if __name__ == "__main__":
+async def main():
+    setup_logging()
     CONTRACTS = [Stock(**stk) for stk in constants.CONTRACTS]
     rtt = Trader(
         contracts=CONTRACTS,
@@ -212,4 +263,8 @@ if __name__ == "__main__":
         intraday_low_threshold=0.0001,
         _bypass_update_window=False,
     )
-    rtt.consume()
+    await rtt.consume()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,22 @@
 from __future__ import annotations
 
+import functools
 import logging
 import os
-import pickle
+import time
+from datetime import date
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
 from typing import Any
 
 import exchange_calendars as xcals
+import msgpack
 from aiokafka import AIOKafkaConsumer
 from kafka import KafkaConsumer
+from kafka import KafkaProducer
 from kafka import TopicPartition
+from real_time_trading import constants
 from real_time_trading.objects.utc_datetime import UTCDateTime
 
 
@@ -32,11 +38,11 @@ def bytes2str(b: bytes) -> str:
 
 
 def object2bytes(o: Any) -> bytes:
-    return pickle.dumps(o)
+    return msgpack.packb(o, use_bin_type=True)
 
 
 def bytes2object(b: bytes) -> Any:
-    return pickle.loads(b)
+    return msgpack.unpackb(b, raw=False)
 
 
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S%Z"
@@ -69,18 +75,54 @@ def get_utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+@functools.lru_cache(maxsize=None)
+def get_shared_producer() -> KafkaProducer:
+    """Get the process wide kafka producer, created on first use.
+
+    It has no serializers so that every topic can share one connection and
+    batching buffer; keys and values must be passed as bytes.
+    """
+    return KafkaProducer(
+        bootstrap_servers=constants.KAFKA_BOOTSTRAP_SERVERS,
+        acks=1,
+        retries=3,
+        max_in_flight_requests_per_connection=5,
+        # ticks arrive in bursts and each message is small, so let the
+        # producer wait a few ms and pack them into large compressed
+        # batches; batch_size is a ceiling, linger_ms bounds the latency
+        linger_ms=10,
+        batch_size=131072,
+        compression_type="lz4",
+    )
+
+
 def makedirs(path: str):
     os.makedirs(path, exist_ok=True)
 
 
 def is_core_market_minutes(dt: UTCDateTime) -> bool:
-    """dt should be timezone aware"""
-    assert dt.tzinfo is not None
-
-    open_, close = get_market_open_close(dt)
-    if open_ is None or close is None:
+    time_ms = dt.timestamp_ms()
+    open_ms, close_ms = get_market_open_close_ms(time_ms)
+    if open_ms is None or close_ms is None:
         return False
-    return dt >= open_ and dt < close
+    return open_ms <= time_ms < close_ms
+
+
+@functools.lru_cache(maxsize=None)
+def get_nasdaq_calendar() -> xcals.ExchangeCalendar:
+    return xcals.get_calendar("NASDAQ")
+
+
+@functools.lru_cache(maxsize=32)
+def _open_close_for_date(
+    date: str,
+) -> tuple[UTCDateTime | None, UTCDateTime | None]:
+    nasdaq = get_nasdaq_calendar()
+    if not nasdaq.is_session(date):
+        return None, None
+    open_ = nasdaq.session_open(date)
+    close = nasdaq.session_close(date)
+    return UTCDateTime.from_utc(open_), UTCDateTime.from_utc(close)
 
 
 def get_market_open_close(
@@ -90,17 +132,33 @@ def get_market_open_close(
     open is inclusive, close is exclusive.
 
     dt should be timezone aware. If dt is None, the current time is used.
+    Results are cached by date.
     """
     if dt is None:
         dt = UTCDateTime.now()  # local time, not UTC
 
-    nasdaq = xcals.get_calendar("NASDAQ")
-    date = datetime2datestr(dt)
-    if not nasdaq.is_session(date):
+    return _open_close_for_date(datetime2datestr(dt))
+
+
+MS_PER_DAY = 86_400_000
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@functools.lru_cache(maxsize=32)
+def _open_close_ms_for_day(day: int) -> tuple[int | None, int | None]:
+    open_, close = _open_close_for_date(
+        date.fromordinal(_EPOCH_ORDINAL + day).strftime(DATE_FORMAT),
+    )
+    if open_ is None or close is None:
         return None, None
-    open_ = nasdaq.session_open(date)
-    close = nasdaq.session_close(date)
-    return UTCDateTime.from_utc(open_), UTCDateTime.from_utc(close)
+    return open_.timestamp_ms(), close.timestamp_ms()
+
+
+def get_market_open_close_ms(time_ms: int) -> tuple[int | None, int | None]:
+    """Same as get_market_open_close, but takes and returns unix times in
+    milliseconds so the per tick checks are integer compares.
+    """
+    return _open_close_ms_for_day(time_ms // MS_PER_DAY)
 
 
 def get_local_now() -> datetime:
@@ -108,6 +166,28 @@ def get_local_now() -> datetime:
     return datetime.now().astimezone()
 
 
+def get_now_ms() -> int:
+    """get the current unix time in milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+def _local_midnight_ms(day: date) -> int:
+    # astimezone on a naive datetime looks up the local offset at that
+    # instant, so each midnight is correct across dst transitions
+    midnight = datetime(day.year, day.month, day.day).astimezone()
+    return int(midnight.timestamp() * 1000)
+
+
+def get_local_day_bounds_ms() -> tuple[int, int]:
+    """get the unix times in milliseconds of the start of the current local
+    day and of the next one"""
+    today = get_local_now().date()
+    return (
+        _local_midnight_ms(today),
+        _local_midnight_ms(today + timedelta(days=1)),
+    )
+
+
 def set_offsets_by_time(
     consumer: KafkaConsumer,
     start_time: UTCDateTime | None = None,
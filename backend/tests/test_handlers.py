@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from datetime import timezone
+
+from ib_insync import Ticker
+from ib_insync.contract import Stock
+from real_time_trading.handlers import RawTickerFileHandler
+from real_time_trading.handlers import RawTickerKafkaHandler
+from real_time_trading.objects.raw_ticker import RawTicker
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, topic, **kwargs):
+        self.sent.append((topic, kwargs))
+
+
+def test_raw_ticker_file_handler(tmp_path):
+    handler = RawTickerFileHandler(
+        directory=str(tmp_path),
+        filename_prefix="test",
+    )
+    aapl = Ticker(contract=Stock("AAPL", "SMART", "USD"), last=1.0)
+    msft = Ticker(contract=Stock("MSFT", "SMART", "USD"), last=2.0)
+    handler([aapl, msft])
+    handler([aapl])
+    handler.close()
+
+    aapl_lines = (tmp_path / "test_AAPL.txt").read_text().splitlines()
+    msft_lines = (tmp_path / "test_MSFT.txt").read_text().splitlines()
+    assert aapl_lines == [str(aapl), str(aapl)]
+    assert msft_lines == [str(msft)]
+
+
+def test_raw_ticker_file_handler_default_prefix(tmp_path):
+    handler = RawTickerFileHandler(directory=str(tmp_path))
+    aapl = Ticker(contract=Stock("AAPL", "SMART", "USD"), last=1.0)
+    handler([aapl])
+    handler.close()
+
+    today = datetime.now().astimezone().strftime("%Y%m%d")
+    filename = tmp_path / f"raw_ticker_{today}_AAPL.txt"
+    assert filename.read_text().splitlines() == [str(aapl)]
+
+
+def test_raw_ticker_kafka_handler_filters():
+    producer = FakeProducer()
+    handler = RawTickerKafkaHandler(topic="raw", producer=producer)
+    contract = Stock("AAPL", "SMART", "USD")
+    in_session = datetime(2024, 1, 2, 15, 0, tzinfo=timezone.utc)
+    pre_market = datetime(2024, 1, 2, 13, 0, tzinfo=timezone.utc)
+
+    handler.to_kafka(Ticker(contract=contract, time=in_session, last=1.0))
+    handler.to_kafka(Ticker(contract=contract, time=pre_market, last=1.0))
+    handler.to_kafka(Ticker(contract=contract, time=in_session, last=math.nan))
+
+    assert len(producer.sent) == 1
+    topic, kwargs = producer.sent[0]
+    assert topic == "raw"
+    assert kwargs["key"] == b"AAPL"
+    assert RawTicker.from_message(kwargs["value"]).last == 1.0
+
+
+def test_raw_ticker_kafka_handler_all_sessions():
+    producer = FakeProducer()
+    handler = RawTickerKafkaHandler(
+        topic="raw",
+        producer=producer,
+        core_market_only=False,
+    )
+    pre_market = datetime(2024, 1, 2, 13, 0, tzinfo=timezone.utc)
+    handler.to_kafka(
+        Ticker(
+            contract=Stock("AAPL", "SMART", "USD"),
+            time=pre_market,
+            last=1.0,
+        ),
+    )
+    assert len(producer.sent) == 1
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from ib_insync import Ticker
+from ib_insync.contract import Stock
+from real_time_trading.handlers import Handler
+from real_time_trading.ib_app import AsyncIBApp
+
+
+class RecordingHandler(Handler):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers):
+        self.calls.append(tickers)
+
+
+class FailingHandler(Handler):
+    def __call__(self, tickers):
+        raise RuntimeError("broker down")
+
+
+def emit(app: AsyncIBApp, tickers: set[Ticker]):
+    app._ib.pendingTickersEvent.emit(tickers)
+
+
+def test_pending_tickers_deduplicated_by_symbol():
+    app = AsyncIBApp(host="localhost", port=7496, client_id=1)
+    handler = RecordingHandler()
+    app.request_market_data(contracts=[], callbacks=[handler])
+
+    first = Ticker(contract=Stock("AAPL", "SMART", "USD"), last=1.0)
+    second = Ticker(contract=Stock("AAPL", "SMART", "USD"), last=2.0)
+    msft = Ticker(contract=Stock("MSFT", "SMART", "USD"), last=3.0)
+    emit(app, {first, second, msft})
+
+    assert len(handler.calls) == 1
+    tickers = handler.calls[0]
+    assert isinstance(tickers, list)
+    assert sorted(t.contract.symbol for t in tickers) == ["AAPL", "MSFT"]
+
+
+def test_callbacks_registered_once_across_reconnects():
+    app = AsyncIBApp(host="localhost", port=7496, client_id=1)
+    handler = RecordingHandler()
+    # on_connected requests market data again after every reconnect
+    app.request_market_data(contracts=[], callbacks=[handler])
+    app.request_market_data(contracts=[], callbacks=[handler])
+
+    emit(app, {Ticker(contract=Stock("AAPL", "SMART", "USD"), last=1.0)})
+    assert app.market_data_callbacks == [handler]
+    assert len(handler.calls) == 1
+
+
+def test_failing_callback_does_not_block_others():
+    app = AsyncIBApp(host="localhost", port=7496, client_id=1)
+    handler = RecordingHandler()
+    app.request_market_data(
+        contracts=[],
+        callbacks=[FailingHandler(), handler],
+    )
+
+    emit(app, {Ticker(contract=Stock("AAPL", "SMART", "USD"), last=1.0)})
+    assert len(handler.calls) == 1
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import math
+
+from real_time_trading.objects.raw_ticker import RawTicker
+from real_time_trading.objects.utc_datetime import UTCDateTime
+
+
+def test_raw_ticker_message_round_trip():
+    raw_ticker = RawTicker(
+        symbol="GOOGL",
+        last=140.25,
+        bid=140.2,
+        ask=140.3,
+        time=UTCDateTime(2024, 1, 2, 14, 30, 1, 250000),
+    )
+    message = raw_ticker.to_message()
+    assert isinstance(message, bytes)
+    assert RawTicker.from_message(message) == raw_ticker
+
+
+def test_raw_ticker_message_nan():
+    raw_ticker = RawTicker(
+        symbol="AAPL",
+        last=math.nan,
+        bid=math.nan,
+        ask=math.nan,
+        time=UTCDateTime(2024, 1, 2, 14, 30),
+    )
+    decoded = RawTicker.from_message(raw_ticker.to_message())
+    assert decoded.symbol == "AAPL"
+    assert decoded.time == raw_ticker.time
+    assert math.isnan(decoded.last)
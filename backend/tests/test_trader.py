@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+from ib_insync.contract import Stock
+from real_time_trading import constants
+from real_time_trading.objects.raw_ticker import RawTicker
+from real_time_trading.objects.utc_datetime import UTCDateTime
+from real_time_trading.trader import Trader
+
+SYMBOLS = ["AAPL", "AMZN", "GOOGL", "MSFT"]
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, topic, **kwargs):
+        self.sent.append((topic, kwargs))
+
+
+def make_trader(producer, **kwargs) -> Trader:
+    """Must be called inside a running event loop"""
+    return Trader(
+        contracts=[Stock(s, "SMART", "USD") for s in SYMBOLS],
+        producer=producer,
+        **kwargs,
+    )
+
+
+def make_message(symbol: str, last: float):
+    raw_ticker = RawTicker(
+        symbol=symbol,
+        last=last,
+        bid=last,
+        ask=last,
+        time=UTCDateTime.now(),
+    )
+    return SimpleNamespace(key=symbol, value=raw_ticker.to_message())
+
+
+def test_consume_skips_nan_last():
+    async def run():
+        trader = make_trader(FakeProducer(), _bypass_update_window=True)
+        await trader._consume(make_message("AAPL", 100.0))
+        await trader._consume(make_message("AAPL", math.nan))
+        assert trader.tickers["AAPL"].last_price == 100.0
+        await trader._consume(make_message("AAPL", 101.0))
+        await trader._consume(make_message("AAPL", 99.0))
+
+        aapl = trader.tickers["AAPL"]
+        assert aapl.last_price == 99.0
+        assert trader._last_gap["AAPL"] == aapl.gap
+        assert "AAPL" in trader._gap_index
+        await trader._consumer.stop()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "dt, expected",
+    [
+        # 2024-01-02 session is 14:30-21:00 UTC
+        (UTCDateTime(2024, 1, 2, 14, 34, 59, 999000), False),
+        (UTCDateTime(2024, 1, 2, 14, 35), True),  # open + bake in
+        (UTCDateTime(2024, 1, 2, 18, 0), True),
+        (UTCDateTime(2024, 1, 2, 20, 49, 59, 999000), True),
+        (UTCDateTime(2024, 1, 2, 20, 50), False),  # close - bake out
+        (UTCDateTime(2024, 1, 6, 18, 0), False),  # saturday
+    ],
+)
+def test_inside_update_window(dt, expected):
+    async def run():
+        trader = make_trader(
+            FakeProducer(),
+            bake_in_minutes=5,
+            bake_out_minutes=10,
+        )
+        assert trader.inside_update_window(dt.timestamp_ms()) == expected
+        await trader._consumer.stop()
+
+    asyncio.run(run())
+
+
+def top_events(producer: FakeProducer) -> list[str]:
+    return [
+        topic
+        for topic, _ in producer.sent
+        if topic in (constants.TOP_HIGH_EVENT, constants.TOP_LOW_EVENT)
+    ]
+
+
+def test_gap_index_matches_full_sort():
+    async def run():
+        trader = make_trader(FakeProducer(), _bypass_update_window=True)
+        rng = random.Random(0)
+        for _ in range(500):
+            symbol = rng.choice(SYMBOLS)
+            await trader._consume(
+                make_message(symbol, 100 + rng.gauss(0, 3)),
+            )
+            indexed = [trader.tickers[s].gap for s in trader._gap_index]
+            assert indexed == sorted(t.gap for t in trader.tickers.values())
+        await trader._consumer.stop()
+
+    asyncio.run(run())
+
+
+def test_top_symbol_events():
+    async def run():
+        producer = FakeProducer()
+        trader = make_trader(
+            producer,
+            n_top_tickers=2,
+            n_bottom_tickers=2,
+            _bypass_update_window=True,
+        )
+        for symbol in SYMBOLS:
+            await trader._consume(make_message(symbol, 100.0))
+
+        # first check sends both events, even with nothing ranked yet
+        await trader._check_top_symbols(UTCDateTime.now())
+        assert top_events(producer) == [
+            constants.TOP_HIGH_EVENT,
+            constants.TOP_LOW_EVENT,
+        ]
+        assert trader.top_n_symbols is not None
+        assert trader.top_n_symbols.signature == ()
+
+        async def consume(symbol: str, last: float) -> list[str]:
+            producer.sent.clear()
+            await trader._consume(make_message(symbol, last))
+            return top_events(producer)
+
+        # AAPL joins the top
+        assert await consume("AAPL", 101.0) == [constants.TOP_HIGH_EVENT]
+        # new high, but only the price moved
+        assert await consume("AAPL", 102.0) == []
+        # AMZN joins, ranked by gap
+        assert await consume("AMZN", 103.0) == [constants.TOP_HIGH_EVENT]
+        assert trader.top_n_symbols.signature == ("AAPL", "AMZN")
+        # same symbols, new order
+        assert await consume("AAPL", 104.0) == [constants.TOP_HIGH_EVENT]
+        assert trader.top_n_symbols.signature == ("AMZN", "AAPL")
+        # AAPL leaves the top and joins the bottom
+        assert await consume("AAPL", 99.0) == [
+            constants.TOP_HIGH_EVENT,
+            constants.TOP_LOW_EVENT,
+        ]
+        assert trader.top_n_symbols.signature == ("AMZN",)
+        assert trader.bottom_n_symbols is not None
+        assert trader.bottom_n_symbols.signature == ("AAPL",)
+        await trader._consumer.stop()
+
+    asyncio.run(run())
@@ -110,3 +110,13 @@ def test_utc_datetime_to_timezone():
     assert dt.hour == 11
     assert dt.minute == 30
     assert dt.second == 0
+
+
+def test_utc_datetime_timestamp_us():
+    utc_dt = UTCDateTime(2021, 1, 1, 3, 30, 15, 123456)
+    assert utc_dt.timestamp_us() == 1609471815123456
+    assert UTCDateTime.from_timestamp_us(utc_dt.timestamp_us()) == utc_dt
+    assert isinstance(
+        UTCDateTime.from_timestamp_us(utc_dt.timestamp_us()),
+        UTCDateTime,
+    )
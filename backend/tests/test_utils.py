@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+import pytest
+from real_time_trading import utils
+from real_time_trading.objects.utc_datetime import UTCDateTime
+
+
+@pytest.mark.parametrize(
+    "dt, expected",
+    [
+        (UTCDateTime(2024, 1, 2, 14, 29, 59), False),
+        (UTCDateTime(2024, 1, 2, 14, 30), True),
+        (UTCDateTime(2024, 1, 2, 20, 59, 59), True),
+        (UTCDateTime(2024, 1, 2, 21, 0), False),
+        (UTCDateTime(2024, 1, 6, 15, 0), False),  # saturday
+    ],
+)
+def test_is_core_market_minutes(dt, expected):
+    assert utils.is_core_market_minutes(dt) == expected
+
+
+def test_get_market_open_close_ms():
+    dt = UTCDateTime(2024, 1, 2, 15, 0)
+    open_, close = utils.get_market_open_close(dt)
+    assert open_ is not None and close is not None
+    assert utils.get_market_open_close_ms(dt.timestamp_ms()) == (
+        open_.timestamp_ms(),
+        close.timestamp_ms(),
+    )
+
+    saturday = UTCDateTime(2024, 1, 6, 15, 0)
+    assert utils.get_market_open_close_ms(saturday.timestamp_ms()) == (
+        None,
+        None,
+    )
+
+
+@pytest.fixture
+def new_york_tz(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.parametrize(
+    "day, hours",
+    [
+        (datetime(2024, 3, 10, 12, 0), 23),  # dst starts
+        (datetime(2024, 11, 3, 12, 0), 25),  # dst ends
+        (datetime(2024, 1, 2, 12, 0), 24),
+    ],
+)
+def test_get_local_day_bounds_ms_dst(new_york_tz, monkeypatch, day, hours):
+    monkeypatch.setattr(utils, "get_local_now", lambda: day.astimezone())
+    start_ms, end_ms = utils.get_local_day_bounds_ms()
+    assert end_ms - start_ms == hours * 3_600_000
+    start = datetime.fromtimestamp(start_ms / 1000)
+    assert (start.date(), start.hour) == (day.date(), 0)